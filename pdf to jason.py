@@ -4,6 +4,7 @@
 import os
 import json
 import pdfplumber
+import pypdfium2 as pdfium
 import re
 import spacy
 import pytesseract
@@ -13,12 +14,89 @@ from num2words import num2words
 # Load NLP model
 nlp = spacy.load("en_core_web_sm")
 
-def extract_text_from_pdf(pdf_path):
+PRODUCT_START_MARKERS = ["Sl Description of", "Sl Particulars Amount", "Sl Particulars",
+                         "Sl Description of Goods", "No. Goods and Services"]
+PRODUCT_END_MARKERS = ["OUTPUT", "Out-Put", "TOTAL", "S-GST", "C-GST", "IGST",
+                       "Grand Total", "Payable Amount", "SGST", "CGST", "Amount Chargeable"]
+
+# Page screening works on whitespace-free pdfium text, so patterns carry no spaces
+COPY_LABEL_PATTERN = re.compile(
+    r"ORIGINAL|DUPLICATE|TRIPLICATE|QUADRUPLICATE|EXTRACOPY|"
+    r"FOR(RECIPIENT|TRANSPORTER|SUPPLIER|BUYER|ASSESSEE)", re.IGNORECASE)
+ANNEXURE_PATTERN = re.compile(r"^(Page\d+)?(e-WayBill|Annexure|Terms(and|&)Conditions)", re.IGNORECASE)
+HEADER_PATTERN = re.compile(r"InvoiceNo", re.IGNORECASE)
+TOTALS_PATTERN = re.compile(
+    r"Total|AmountChargeable|RoundOff|TradeDiscount|DiscountA/c|C-?GST|S-?GST|IGST", re.IGNORECASE)
+
+def get_pages_screening_text(pdf_path):
+    # pdfium's native text dump is far cheaper than a pdfminer layout pass per page
+    doc = pdfium.PdfDocument(pdf_path)
+    try:
+        return [re.sub(r"\s+", "", page.get_textpage().get_text_range()) for page in doc]
+    finally:
+        doc.close()
+
+
+def select_invoice_pages(pdf_path):
+    """Returns indexes of pages that can hold header, item or totals data, once per invoice copy.
+    Returns None if the PDF cannot be screened, in which case every page should be read."""
+    try:
+        texts = get_pages_screening_text(pdf_path)
+    except Exception as e:
+        print(f"Page screening failed for {pdf_path}, using all pages: {e}")
+        return None
+
+    start_markers = [m.replace(" ", "") for m in PRODUCT_START_MARKERS]
+    end_markers = [m.replace(" ", "") for m in PRODUCT_END_MARKERS]
+    # Without an item start marker the item pages can't be located, so only drop copies and annexures
+    has_products = any(m in text for text in texts for m in start_markers)
+
+    selected = []
+    seen_signatures = set()
+    in_products = False
+
+    for index, text in enumerate(texts):
+        # e-Way Bill, annexure and T&C pages never feed the invoice fields
+        if selected and ANNEXURE_PATTERN.match(text):
+            continue
+
+        # "Original for Recipient" / "Duplicate for Transporter" copies differ only by their label
+        signature = COPY_LABEL_PATTERN.sub("", text)
+        if text and signature in seen_signatures:
+            continue
+        seen_signatures.add(signature)
+
+        keep = not selected or not has_products or bool(HEADER_PATTERN.search(text) or TOTALS_PATTERN.search(text))
+
+        # Item rows can run over pages with no header or totals of their own
+        start = 0
+        if not in_products:
+            start = min((text.find(m) for m in start_markers if m in text), default=-1)
+            in_products = start != -1
+        if in_products:
+            keep = True
+            if any(m in text[start:] for m in end_markers):
+                in_products = False
+
+        if keep:
+            selected.append(index)
+
+    if len(selected) < len(texts):
+        print(f"Skipping {len(texts) - len(selected)} of {len(texts)} pages (annexures/duplicate copies)")
+    return selected
+
+
+def get_selected_pages(pdf, page_indexes):
+    if page_indexes is None:
+        return pdf.pages
+    return [pdf.pages[i] for i in page_indexes]
+
+def extract_text_from_pdf(pdf_path, page_indexes=None):
     """Extracts text from a PDF. Uses OCR if no extractable text found."""
     extracted_text = ""
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
+            for page in get_selected_pages(pdf, page_indexes):
                 text = page.extract_text()
                 if text:
                     extracted_text += text + "\n"
@@ -41,12 +119,12 @@ def convert_number_to_words(number):
     except:
         return None
 
-def extract_products_from_pdf(pdf_path):
+def extract_products_from_pdf(pdf_path, page_indexes=None):
     """Attempts to extract product rows from invoice tables."""
     products = []
     try:
         with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
+            for page in get_selected_pages(pdf, page_indexes):
                 tables = page.extract_tables()
                 for table in tables:
                     headers = table[0]
@@ -144,9 +222,10 @@ def process_single_pdf(pdf_path):
         return
 
     print(f" Processing: {pdf_path}")
-    text = extract_text_from_pdf(pdf_path)
+    page_indexes = select_invoice_pages(pdf_path)
+    text = extract_text_from_pdf(pdf_path, page_indexes)
     invoice_data = extract_invoice_data(text)
-    invoice_data["products"] = extract_products_from_pdf(pdf_path)
+    invoice_data["products"] = extract_products_from_pdf(pdf_path, page_indexes)
 
     output_filename = os.path.splitext(os.path.basename(pdf_path))[0] + ".json"
     output_path = os.path.join(os.path.dirname(pdf_path), output_filename)